@@ -0,0 +1,55 @@
+"""
+Measures cold start of the emulator, i.e. how long it takes a fresh process
+to get from launch to its first frame and quit
+
+Run with:
+    python Benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+entry_point = os.path.join(source_path, "__init__.py")
+
+# Draws the 0 sprite then loops forever
+TEST_ROM = bytes([
+    0x60, 0x00, # V0 = 0
+    0xF0, 0x29, # I = sprite for V0
+    0xD0, 0x05, # Draw it at (V0, V0)
+    0x12, 0x06, # Jump to self
+])
+
+def time_runs(command, runs, env):
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, cwd=source_path, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+def report(name, times):
+    print(f"{name:<20} median {statistics.median(times)*1000:8.1f} ms"
+          f"   min {min(times)*1000:8.1f} ms")
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    # Headless so this can run anywhere
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rom = os.path.join(tmp, "startup.ch8")
+        with open(rom, "wb") as f:
+            f.write(TEST_ROM)
+
+        report("interpreter only", time_runs([sys.executable, "-c", "pass"], runs, env))
+        report("--help", time_runs([sys.executable, entry_point, "--help"], runs, env))
+        report("first frame", time_runs([sys.executable, entry_point, rom,
+                                         "--frames", "1", "--mute"], runs, env))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import runpy
+import sys
+
+import pytest
+
+source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, source_path)
+
+from settings import Settings
+
+# __init__.py is the entry point script rather than an importable module
+cli = runpy.run_path(os.path.join(source_path, "__init__.py"))
+parse_args = cli["parse_args"]
+settings_from_args = cli["settings_from_args"]
+
+def test_defaults():
+    args = parse_args([])
+    assert args.rom is None
+    assert args.frames is None
+    settings = settings_from_args(args)
+    defaults = Settings()
+    assert settings.instructions_per_second == defaults.instructions_per_second
+    assert settings.refresh_rate == defaults.refresh_rate
+    assert settings.pixels_per_bit == defaults.pixels_per_bit
+    assert settings.timing_mode == defaults.timing_mode
+    assert settings.sound_enabled
+
+def test_options_map_to_settings():
+    args = parse_args(["game.ch8", "--ips", "700", "--refresh-rate", "30",
+                       "--scale", "10", "--mute", "--timing", "cycles",
+                       "--frames", "5"])
+    assert args.rom == "game.ch8"
+    assert args.frames == 5
+    settings = settings_from_args(args)
+    assert settings.instructions_per_second == 700
+    assert settings.refresh_rate == 30
+    assert settings.pixels_per_bit == 10
+    assert settings.timing_mode == "cycles"
+    assert not settings.sound_enabled
+
+def test_bad_timing_mode():
+    with pytest.raises(SystemExit):
+        parse_args(["--timing", "fast"])
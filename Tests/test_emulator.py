@@ -18,4 +18,13 @@ class TestEmulator:
         print(f"x: {x}")
         print(f"y: {y}")
         while True:
-            pygame.display.flip()
\ No newline at end of file
+            pygame.display.flip()
+
+def test_broken_audio_is_silent(monkeypatch):
+    monkeypatch.setenv("SDL_AUDIODRIVER", "bogusdriver")
+    machine = Emulator()
+    machine.set_sound_timer(5)
+    # Shouldn't raise, sound just gets turned off
+    machine.play_sound()
+    assert not machine.settings.sound_enabled
+    assert not machine.sound_ready
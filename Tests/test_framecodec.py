@@ -0,0 +1,89 @@
+import os
+import sys
+import zlib
+
+import pytest
+
+source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, source_path)
+
+from emulator import Emulator
+from framecodec import (FrameEncoder, FrameDecoder, FrameDecodeError,
+                        pack_frame, unpack_frame, KEYFRAME, DELTA, NO_CHANGE)
+
+@pytest.fixture
+def recorded_frames():
+    """Record frames of hex digits bouncing around the screen"""
+    interpreter = Emulator().interpreter
+    frames = []
+    for frame in range(120):
+        digit = frame % 16
+        interpreter.v[0] = (frame * 3) % 64
+        interpreter.v[1] = (frame * 2) % 32
+        interpreter.v[2] = digit
+        interpreter.run_instruction(0xF229) # I = sprite for V2
+        interpreter.run_instruction(0xD015) # Draw it at (V0, V1)
+        frames.append([row.copy() for row in interpreter.screen_buffer])
+        # Leave the screen alone every few frames to hit the no change path
+        if frame % 4:
+            frames.append([row.copy() for row in interpreter.screen_buffer])
+        if frame % 30 == 29:
+            interpreter.run_instruction(0x00E0)
+    return frames
+
+def test_pack_round_trip(recorded_frames):
+    for frame in recorded_frames:
+        packed = pack_frame(frame)
+        assert len(packed) == 256
+        assert unpack_frame(packed, 64, 32) == frame
+
+def test_round_trip(recorded_frames):
+    encoder = FrameEncoder(keyframe_interval=50)
+    decoder = FrameDecoder()
+    for frame in recorded_frames:
+        assert decoder.decode(encoder.encode(frame)) == frame
+
+def test_compression(recorded_frames):
+    encoder = FrameEncoder()
+    encoded = sum(len(encoder.encode(frame)) for frame in recorded_frames)
+    raw = sum(len(pack_frame(frame)) for frame in recorded_frames)
+    assert encoded * 10 < raw
+
+def test_keyframe_interval():
+    encoder = FrameEncoder(keyframe_interval=3)
+    frame = [[0] * 64 for i in range(32)]
+    headers = [encoder.encode(frame)[0] for i in range(7)]
+    assert headers == [KEYFRAME, NO_CHANGE, NO_CHANGE,
+                       KEYFRAME, NO_CHANGE, NO_CHANGE, KEYFRAME]
+
+def test_no_change_packet_is_one_byte():
+    encoder = FrameEncoder()
+    frame = [[0] * 64 for i in range(32)]
+    encoder.encode(frame)
+    assert encoder.encode(frame) == bytes([NO_CHANGE])
+
+def test_delta_before_keyframe():
+    delta = bytes([DELTA]) + zlib.compress(bytes(256))
+    with pytest.raises(FrameDecodeError):
+        FrameDecoder().decode(delta)
+
+def test_empty_packet():
+    with pytest.raises(FrameDecodeError):
+        FrameDecoder().decode(b"")
+
+def test_corrupt_body():
+    with pytest.raises(FrameDecodeError):
+        FrameDecoder().decode(bytes([KEYFRAME]) + b"not zlib")
+
+def test_unknown_header():
+    with pytest.raises(FrameDecodeError):
+        FrameDecoder().decode(bytes([0x7F]))
+
+def test_delta_wrong_length():
+    encoder = FrameEncoder()
+    decoder = FrameDecoder()
+    decoder.decode(encoder.encode([[0] * 64 for i in range(32)]))
+    # Too long would overflow the XOR, too short would be a partial frame
+    for size in (300, 10):
+        with pytest.raises(FrameDecodeError):
+            decoder.decode(bytes([DELTA]) + zlib.compress(bytes([0xFF]) * size))
@@ -0,0 +1,51 @@
+import os
+import sys
+
+source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, source_path)
+
+from chip8 import Interpreter
+from fuzz import FuzzCase, fuzz, fuzz_cases, run_case
+
+class NoCarryInterpreter(Interpreter):
+    """Deliberately broken, 8xy4 never sets the carry flag"""
+    def run_instruction(self, opcode):
+        super().run_instruction(opcode)
+        if opcode & 0xF00F == 0x8004:
+            self.v[0xF] = 0
+
+def test_reference_agrees_with_itself():
+    instructions, failures = fuzz_cases(Interpreter, Interpreter, seed=1, cases=20, steps=50)
+    assert instructions > 0
+    assert failures == []
+
+def test_mismatch_is_found_and_shrunk():
+    instructions, failures = fuzz_cases(Interpreter, NoCarryInterpreter,
+                                        seed=1, cases=50, steps=50)
+    assert failures
+    for case, mismatch in failures:
+        # Setting a register and adding it to itself is the smallest carry
+        assert len(case.opcodes) <= 2
+        assert case.opcodes[-1] & 0xF00F == 0x8004
+        assert mismatch.field == "v"
+        assert run_case(Interpreter, NoCarryInterpreter, case)[1] is not None
+
+def test_blank_state_case():
+    case = FuzzCase(None, [0x6080, 0x8004])
+    assert run_case(Interpreter, Interpreter, case) == (2, None)
+    steps_run, mismatch = run_case(Interpreter, NoCarryInterpreter, case)
+    assert steps_run == 2
+    assert mismatch.step == 1
+
+def test_steps_stop_at_exception():
+    # Returning with an empty stack raises, so the opcode after it never runs
+    case = FuzzCase(None, [0x00EE, 0x6001])
+    assert run_case(Interpreter, Interpreter, case) == (1, None)
+    instructions, failures = fuzz_cases(Interpreter, Interpreter, seed=0, cases=50, steps=100)
+    assert instructions < 50 * 100
+
+def test_process_pool():
+    instructions, failures = fuzz("chip8:Interpreter", workers=2, batches=2,
+                                  cases=5, steps=20)
+    assert instructions > 0
+    assert failures == []
@@ -0,0 +1,166 @@
+import os
+import sys
+
+import pytest
+
+source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, source_path)
+
+from emulator import Emulator
+from romlib import (RomLibrary, RomNotFound, analyze_rom, disassemble_opcode,
+                    find_basic_blocks, read_rom)
+
+CHIP8_ROM = bytes([
+    0x00, 0xE0, # 200: CLS
+    0x60, 0x05, # 202: LD V0, 5
+    0x30, 0x05, # 204: SE V0, 5
+    0x22, 0x0C, # 206: CALL 20C
+    0x12, 0x08, # 208: JP 208
+    0xFF, 0xFF, # 20A: data
+    0xD0, 0x15, # 20C: DRW V0, V1, 5
+    0x00, 0xEE, # 20E: RET
+])
+
+SCHIP_ROM = bytes([
+    0x00, 0xFF, # 200: HIGH
+    0xD0, 0x10, # 202: DRW V0, V1, 0
+    0x12, 0x04, # 204: JP 204
+])
+
+@pytest.fixture
+def rom_dir(tmp_path):
+    (tmp_path / "test.ch8").write_bytes(CHIP8_ROM)
+    (tmp_path / "games").mkdir()
+    (tmp_path / "games" / "hires.sc8").write_bytes(SCHIP_ROM)
+    (tmp_path / "notes.txt").write_text("not a ROM")
+    return tmp_path
+
+def test_basic_blocks():
+    blocks, reachable = find_basic_blocks(CHIP8_ROM)
+    assert blocks == [(0x200, 0x206), (0x206, 0x208), (0x208, 0x20A), (0x20C, 0x210)]
+    # The data after the jump is never reached
+    assert 0x20A not in reachable
+
+def test_skip_over_long_load():
+    rom = bytes([
+        0x30, 0x00, # 200: SE V0, 0
+        0xF0, 0x00, # 202: LD I, long
+        0x12, 0x34, # 204: (address word)
+        0x00, 0xE0, # 206: CLS
+        0x12, 0x06, # 208: JP 206
+    ])
+    blocks, reachable = find_basic_blocks(rom)
+    assert blocks == [(0x200, 0x202), (0x202, 0x206), (0x206, 0x20A)]
+    # The address word isn't code
+    assert 0x204 not in reachable
+    assert [line[2] for line in analyze_rom(rom)["disassembly"]] == [
+        "SE V0, 0x00", "LD I, long", "CLS", "JP 0x206"]
+
+def test_long_load_doesnt_end_block():
+    rom = bytes([0xF0, 0x00, 0x12, 0x34, 0x60, 0x01, 0x12, 0x00])
+    assert find_basic_blocks(rom)[0] == [(0x200, 0x208)]
+
+def test_analyze_platforms():
+    assert analyze_rom(CHIP8_ROM)["platform"] == "chip8"
+    assert analyze_rom(SCHIP_ROM)["platform"] == "schip"
+    assert analyze_rom(bytes([0x12, 0x00]) + bytes(0x1000))["platform"] == "xochip"
+
+def test_disassemble_opcode():
+    assert disassemble_opcode(0x00E0) == "CLS"
+    assert disassemble_opcode(0xD015) == "DRW V0, V1, 5"
+    assert disassemble_opcode(0xF233) == "LD B, V2"
+    assert disassemble_opcode(0x8008) is None
+
+def test_scan_and_lookup(rom_dir):
+    library = RomLibrary(str(rom_dir))
+    assert library.scan() == 2
+    path, entry = library.lookup("hires.sc8")
+    assert path == os.path.join(str(rom_dir), "games", "hires.sc8")
+    assert entry["platform"] == "schip"
+    assert entry["size"] == len(SCHIP_ROM)
+    # Same ROM can be found by its hash
+    assert library.lookup(entry["sha1"])[1] is entry
+    with pytest.raises(RomNotFound):
+        library.lookup("missing.ch8")
+
+def test_index_is_persistent(rom_dir):
+    RomLibrary(str(rom_dir)).scan()
+    library = RomLibrary(str(rom_dir))
+    # Nothing changed so nothing gets read again
+    assert library.scan() == 0
+    data, entry = library.read("test.ch8")
+    assert data == CHIP8_ROM
+    assert entry["disassembly"][0] == [0x200, 0x00E0, "CLS"]
+
+def test_changed_rom_is_reindexed(rom_dir):
+    library = RomLibrary(str(rom_dir))
+    library.scan()
+    old_sha1 = library.lookup("test.ch8")[1]["sha1"]
+    (rom_dir / "test.ch8").write_bytes(SCHIP_ROM + bytes(2))
+    assert library.scan() == 1
+    assert library.lookup("test.ch8")[1]["sha1"] != old_sha1
+    assert old_sha1 not in library.roms
+
+def test_unchanged_scan_doesnt_write(rom_dir):
+    library = RomLibrary(str(rom_dir))
+    library.scan()
+    saved = os.stat(library.index_file).st_mtime_ns
+    os.remove(library.index_file)
+    # Nothing changed since the last scan so the index isn't written again
+    library.scan()
+    assert not os.path.exists(library.index_file)
+    (rom_dir / "new.ch8").write_bytes(CHIP8_ROM)
+    library.scan()
+    assert os.stat(library.index_file).st_mtime_ns >= saved
+
+def test_save_failure_is_not_fatal(rom_dir):
+    library = RomLibrary(str(rom_dir), str(rom_dir / "missing" / "rom_index.json"))
+    assert library.scan() == 2
+    assert library.save_index() is False
+    assert library.lookup("test.ch8")[1]["platform"] == "chip8"
+    # No temp files left lying around
+    assert not [name for name in os.listdir(rom_dir) if name.endswith(".tmp")]
+
+def test_find_uses_saved_index(rom_dir):
+    RomLibrary(str(rom_dir)).scan()
+    library = RomLibrary(str(rom_dir))
+    calls = []
+    library.scan = lambda: calls.append(1)
+    assert library.find("test.ch8")[1]["platform"] == "chip8"
+    assert calls == []
+
+def test_find_rescans_on_miss(rom_dir):
+    RomLibrary(str(rom_dir)).scan()
+    (rom_dir / "later.ch8").write_bytes(SCHIP_ROM)
+    library = RomLibrary(str(rom_dir))
+    assert library.find("later.ch8")[1]["platform"] == "schip"
+    # A changed file gets rescanned too
+    (rom_dir / "test.ch8").write_bytes(SCHIP_ROM + bytes(4))
+    assert library.find("test.ch8")[1]["platform"] == "schip"
+
+def test_broken_index_is_thrown_away(rom_dir):
+    index_file = rom_dir / "rom_index.json"
+    for broken in ('{"version": 1}', '{"version": 1, "roms": [], "files": {}}',
+                   '[1]', '{"version": 1, "roms": {}, "files": {"test.ch8": 5}}'):
+        index_file.write_text(broken)
+        library = RomLibrary(str(rom_dir))
+        assert library.find("test.ch8")[1]["platform"] == "chip8"
+
+def test_inconsistent_index_lookup(rom_dir):
+    library = RomLibrary(str(rom_dir))
+    library.scan()
+    library.roms.clear()
+    with pytest.raises(RomNotFound):
+        library.lookup("test.ch8")
+    # find rescans and gets the analysis back
+    assert library.find("test.ch8")[1]["platform"] == "chip8"
+
+def test_load_rom(rom_dir):
+    vm = Emulator()
+    memory = vm.memory
+    vm.load_rom(str(rom_dir / "test.ch8"))
+    assert vm.memory is memory
+    assert len(vm.memory) == 0x1000
+    assert bytes(vm.memory[0x200:0x200+len(CHIP8_ROM)]) == CHIP8_ROM
+    with pytest.raises(MemoryError):
+        vm.load_rom_data(bytes(0x1000))
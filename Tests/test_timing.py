@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, source_path)
+
+from emulator import Emulator
+from timing import CycleBudget, build_cost_table, opcode_cost, DRAW_ROW_COST
+
+def load_program(interpreter, opcodes):
+    for i, opcode in enumerate(opcodes):
+        interpreter.memory[0x200 + 2*i] = opcode >> 8
+        interpreter.memory[0x200 + 2*i + 1] = opcode & 0xFF
+
+def test_cost_table():
+    table = build_cost_table()
+    assert len(table) == 0x10000
+    assert table[0x00E0] == opcode_cost(0x00E0)
+    # Drawing and clearing cost more than register ops
+    assert table[0xD011] > table[0x6000]
+    assert table[0x00E0] > table[0x6000]
+    assert table[0xD01F] - table[0xD01E] == DRAW_ROW_COST
+    assert table[0xFF55] > table[0xF055]
+
+def test_cheap_opcodes_run_more():
+    budget = CycleBudget(60)
+    interpreter = Emulator().interpreter
+    # Loop of register ops
+    load_program(interpreter, [0x7001, 0x7101, 0x1200])
+    cheap = budget.run_frame(interpreter)
+
+    budget = CycleBudget(60)
+    interpreter = Emulator().interpreter
+    # Loop of screen clears
+    load_program(interpreter, [0x00E0, 0x1200])
+    expensive = budget.run_frame(interpreter)
+    assert cheap > expensive
+
+def test_vblank_wait_ends_frame():
+    interpreter = Emulator().interpreter
+    load_program(interpreter, [0x6000, 0xD005, 0x1202])
+    assert CycleBudget(60).run_frame(interpreter) == 2
+    assert interpreter.pc == 0x204
+
+    interpreter = Emulator().interpreter
+    load_program(interpreter, [0x6000, 0xD005, 0x1202])
+    assert CycleBudget(60, vblank_wait=False).run_frame(interpreter) > 2
+
+def test_overrun_carries_into_next_frame():
+    budget = CycleBudget(60, vblank_wait=False)
+    interpreter = Emulator().interpreter
+    load_program(interpreter, [0xFF55, 0x1200])
+    budget.run_frame(interpreter)
+    assert budget.debt >= 0
+    assert budget.debt < opcode_cost(0xFF55)
+
+def test_budget_is_per_second_not_per_host_frame():
+    # The VIP's display overhead happens 60 times a second whatever the host does
+    per_second = CycleBudget(60).cycles_per_frame * 60
+    assert abs(CycleBudget(30).cycles_per_frame * 30 - per_second) < 30
+    assert abs(CycleBudget(240).cycles_per_frame * 240 - per_second) < 240
+
+def test_high_refresh_rate_still_runs():
+    interpreter = Emulator().interpreter
+    load_program(interpreter, [0x7001, 0x1200])
+    assert CycleBudget(240).run_frame(interpreter) > 0
+
+def test_impossible_refresh_rate():
+    with pytest.raises(ValueError):
+        CycleBudget(10**6)
@@ -1,5 +1,68 @@
-from emulator import Emulator
+import argparse
+import os
+
+from romlib import RomLibrary, RomNotFound
+from settings import Settings
+
+# Platforms from the ROM library the emulator can actually run
+RUNNABLE_PLATFORMS = ("chip8",)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chip-8 interpreter and emulator")
+    parser.add_argument("rom", nargs="?",
+                        help="path to a .ch8 ROM file, or a file name/SHA-1 from the "
+                             "ROM library (prompts for one if left out)")
+    parser.add_argument("--ips", type=int,
+                        help="instructions per second")
+    parser.add_argument("--timing", choices=("instructions", "cycles"),
+                        help="run a flat number of instructions per frame, or budget "
+                             "each frame in COSMAC VIP machine cycles")
+    parser.add_argument("--refresh-rate", type=int,
+                        help="frames per second (Hz)")
+    parser.add_argument("--scale", type=int,
+                        help="screen pixels per Chip-8 pixel")
+    parser.add_argument("--mute", action="store_true",
+                        help="never open the audio device")
+    parser.add_argument("--frames", type=int,
+                        help="quit after this many frames")
+    return parser.parse_args(argv)
+
+def find_rom(args, settings):
+    """Resolve the ROM argument to a path, going through the library index
+    if it isn't a file. Uses the recommended speed unless --ips was given"""
+    if args.rom is None or os.path.isfile(args.rom):
+        return args.rom
+    library = RomLibrary(settings.rom_directory)
+    try:
+        path, entry = library.find(args.rom)
+    except RomNotFound as e:
+        raise SystemExit(e)
+    if entry["platform"] not in RUNNABLE_PLATFORMS:
+        raise SystemExit(f"{path} looks like a {entry['platform']} ROM, "
+                         f"this emulator only runs {', '.join(RUNNABLE_PLATFORMS)}")
+    if args.ips is None:
+        settings.instructions_per_second = entry["ips"]
+    return path
+
+def settings_from_args(args):
+    settings = Settings()
+    if args.ips is not None:
+        settings.instructions_per_second = args.ips
+    if args.timing is not None:
+        settings.timing_mode = args.timing
+    if args.refresh_rate is not None:
+        settings.refresh_rate = args.refresh_rate
+    if args.scale is not None:
+        settings.pixels_per_bit = args.scale
+    if args.mute:
+        settings.sound_enabled = False
+    return settings
 
 if __name__ == "__main__":
-    vm = Emulator()
-    vm.run()
\ No newline at end of file
+    args = parse_args()
+    settings = settings_from_args(args)
+    rom = find_rom(args, settings)
+    # Imported here so --help and bad arguments don't pay for loading pygame
+    from emulator import Emulator
+    vm = Emulator(settings)
+    vm.run(rom, args.frames)
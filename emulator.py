@@ -44,21 +44,25 @@ Outputs:
 
 """
 import pygame
-from pygame import mixer
 
 from chip8 import Interpreter
 from pixel import Pixel
+from romlib import read_rom
 from settings import Settings
 
 class Emulator:
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, settings=None):
+        self.settings = settings or Settings()
         self.memory = [0x00] * 0x1000 # Don't touch 0x0 - 0x1FF
         self.v = [0x00] * 0x10
         self.I = 0x0000
         self.delay_timer = 0x0
         self.sound_timer = 0x0
-        pygame.init()
+        # Only bring up the subsystems we need, pygame.init() starts all of them.
+        # import pygame already loads the mixer module, but the audio device
+        # isn't opened until the first time something actually beeps
+        pygame.display.init()
+        self.sound_ready = False
         
         # Set up key callbacks
         self.KEY_MAP = {
@@ -74,10 +78,17 @@ class Emulator:
         self.interpreter = Interpreter(self)
         self.instructions_per_second = self.settings.instructions_per_second
         
-        sound_file = "sound.wav"
-        mixer.init()
-        mixer.music.load(sound_file)
-        mixer.music.set_volume(0.8)
+    def setup_sound(self):
+        """Start the mixer and load the sound, only done once there's a sound to play.
+        If there's no working audio device the game just carries on silently"""
+        try:
+            pygame.mixer.init()
+            pygame.mixer.music.load(self.settings.sound_file)
+        except pygame.error:
+            self.settings.sound_enabled = False
+            return
+        pygame.mixer.music.set_volume(self.settings.volume)
+        self.sound_ready = True
         
     def setup_display(self):
         """Configure the pygame display, setup the 2D array of pixels"""
@@ -107,14 +118,18 @@ class Emulator:
         
     def get_rom_file(self):
         """Prompts user to load in a .ch8 ROM file"""
-        return "ROM Files/" + input("Enter Chip8 ROM file name: ")
+        return self.settings.rom_directory + input("Enter Chip8 ROM file name: ")
         
     def load_rom(self, fn):
         """Loads in a given ROM file starting at 0x200"""
-        file = open(fn, 'rb').read()
-        for i in range(len(file)):
-            self.memory[0x200+i] = file[i]
-            # This method of filling an empty list rather than .append is a size check
+        self.load_rom_data(read_rom(fn))
+        
+    def load_rom_data(self, data):
+        """Copies ROM bytes into memory starting at 0x200"""
+        if 0x200 + len(data) > len(self.memory):
+            raise MemoryError("ROM is too big to fit in memory")
+        # Slice assignment keeps the same list so the interpreter's reference stays valid
+        self.memory[0x200:0x200+len(data)] = data
     
     def display_handler(self):
         """Draws the Chip-8 screen buffer to the pygame screen"""
@@ -137,11 +152,14 @@ class Emulator:
         if self.sound_timer > 0:
             self.sound_timer -= 1
     
-    def run(self):
-        # Ask to load in a program
-        file_name = self.get_rom_file()
+    def run(self, file_name=None, max_frames=None):
+        """Run a ROM, asking for one if it wasn't given. Stops after
+        max_frames frames if it's set"""
+        if file_name is None:
+            file_name = self.get_rom_file()
         self.load_rom(file_name)
         running = True
+        frames = 0
         self.setup_timers()
         while running:
             # Pygame event handler
@@ -156,13 +174,21 @@ class Emulator:
                     # Handle sound and delay timers       
                     self.timers_down()
                     
-                    i = 0
-                    while i < self.instructions_per_frame:
-                        i += 1
-                        self.interpreter.cycle()
-                        
-                        # Handle display
+                    if self.cycle_budget is not None:
+                        self.cycle_budget.run_frame(self.interpreter)
                         self.display_handler()
+                    else:
+                        i = 0
+                        while i < self.instructions_per_frame:
+                            i += 1
+                            self.interpreter.cycle()
+                            
+                            # Handle display
+                            self.display_handler()
+                    
+                    frames += 1
+                    if max_frames is not None and frames >= max_frames:
+                        running = False
                                             
                 # ~~Handle I/O with misc pygame events~~
                 
@@ -194,8 +220,11 @@ class Emulator:
         self.sound_timer = new
         
     def play_sound(self):
-        if self.get_sound_timer():
-            mixer.music.play()
+        if self.get_sound_timer() and self.settings.sound_enabled:
+            if not self.sound_ready:
+                self.setup_sound()
+            if self.sound_ready:
+                pygame.mixer.music.play()
             
     def setup_timers(self):
         self.refresh_rate = self.settings.refresh_rate
@@ -204,6 +233,12 @@ class Emulator:
         # Ex) 660 per second / 60 fps = 10 instructions per frame
         self.instructions_per_frame = instructions_per_second // self.refresh_rate
         
+        self.cycle_budget = None
+        if self.settings.timing_mode == "cycles":
+            # Only pay for building the cost table when it's actually used
+            from timing import CycleBudget
+            self.cycle_budget = CycleBudget(self.refresh_rate, self.settings.vblank_wait)
+        
         self.NEW_FRAME = pygame.USEREVENT + 1
         pygame.time.set_timer(self.NEW_FRAME, int(self.frame_time))
         
@@ -0,0 +1,118 @@
+"""
+Delta compressed encoding of the Chip-8 screen buffer
+
+Each frame is packed down to one bit per pixel (64x32 -> 256 bytes), XORed
+against the previous frame and zlib compressed. Most frames only touch a
+handful of pixels so the XOR is almost all zero bytes, which zlib squashes
+down to a few bytes.
+
+Packet layout:
+    1 byte header - KEYFRAME, DELTA or NO_CHANGE
+    Rest - zlib compressed packed bits (nothing for NO_CHANGE)
+
+Keyframes hold the full packed frame and are sent every keyframe_interval
+frames so a viewer can join late or recover from a dropped packet.
+"""
+import zlib
+
+KEYFRAME = 0x00
+DELTA = 0x01
+NO_CHANGE = 0x02
+
+def pack_frame(screen_buffer):
+    """Pack a 2D screen buffer into bytes, 8 pixels per byte (MSB is leftmost)"""
+    packed = bytearray()
+    for row in screen_buffer:
+        for start in range(0, len(row), 8):
+            byte = 0
+            for bit in row[start:start+8]:
+                byte = (byte << 1) | (bit & 1)
+            packed.append(byte)
+    return bytes(packed)
+
+def unpack_frame(packed, width, height):
+    """Turn packed bytes back into a 2D screen buffer"""
+    bytes_per_row = width // 8
+    screen_buffer = []
+    for y in range(height):
+        row = []
+        for byte in packed[y*bytes_per_row:(y+1)*bytes_per_row]:
+            for shift in range(7, -1, -1):
+                row.append((byte >> shift) & 1)
+        screen_buffer.append(row)
+    return screen_buffer
+
+def xor_bytes(a, b):
+    """XOR two equal length byte strings together"""
+    # Doing it as one big int is a lot faster than a byte by byte loop
+    n = int.from_bytes(a, "big") ^ int.from_bytes(b, "big")
+    return n.to_bytes(len(a), "big")
+
+class FrameEncoder:
+    def __init__(self, keyframe_interval=60, compression_level=9):
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+        self.reset()
+
+    def reset(self):
+        """Forget the previous frame so the next packet is a keyframe"""
+        self.previous = None
+        self.frames_since_keyframe = 0
+
+    def encode(self, screen_buffer):
+        """Encode a screen buffer into a packet (bytes)"""
+        packed = pack_frame(screen_buffer)
+
+        if (self.previous is None
+                or self.frames_since_keyframe >= self.keyframe_interval - 1):
+            self.previous = packed
+            self.frames_since_keyframe = 0
+            return bytes([KEYFRAME]) + zlib.compress(packed, self.compression_level)
+
+        self.frames_since_keyframe += 1
+        # Fast path, nothing changed so there's nothing to compress
+        if packed == self.previous:
+            return bytes([NO_CHANGE])
+
+        delta = xor_bytes(packed, self.previous)
+        self.previous = packed
+        return bytes([DELTA]) + zlib.compress(delta, self.compression_level)
+
+class FrameDecoder:
+    def __init__(self, width=64, height=32):
+        self.width = width
+        self.height = height
+        self.previous = None
+
+    def decode(self, packet):
+        """Decode a packet from FrameEncoder back into a 2D screen buffer,
+        anything malformed raises FrameDecodeError"""
+        if len(packet) == 0:
+            raise FrameDecodeError("Empty packet")
+        header = packet[0]
+        if header == KEYFRAME:
+            packed = self.decompress(packet[1:])
+        elif header not in (NO_CHANGE, DELTA):
+            raise FrameDecodeError(f"Unknown packet header {hex(header)}")
+        elif self.previous is None:
+            raise FrameDecodeError("Can't decode a delta before the first keyframe")
+        elif header == NO_CHANGE:
+            packed = self.previous
+        else:
+            packed = xor_bytes(self.decompress(packet[1:]), self.previous)
+
+        self.previous = packed
+        return unpack_frame(packed, self.width, self.height)
+
+    def decompress(self, body):
+        """Decompress a packet body and make sure it's one whole frame"""
+        try:
+            packed = zlib.decompress(body)
+        except zlib.error as e:
+            raise FrameDecodeError(f"Corrupt packet body: {e}") from e
+        if len(packed) != self.width * self.height // 8:
+            raise FrameDecodeError("Packet doesn't match the screen size")
+        return packed
+
+class FrameDecodeError(Exception):
+    pass
@@ -0,0 +1,288 @@
+"""
+Differential fuzzer for Chip8 execution engines
+
+Runs random opcode streams from random machine states through the reference
+Interpreter.run_instruction and a candidate engine, comparing memory, V, I,
+pc, stack, timers, Fx0A key wait state and screen after every step. Any
+mismatch gets shrunk down to the smallest opcode stream (and simplest
+starting state) that still shows it.
+
+A candidate engine is any class that's built with Engine(machine) and has
+the same memory/v/I/pc/stack/screen_buffer/waiting_for_press/stored_key
+attributes and run_instruction method as the Interpreter. Random opcodes
+(Cxkk) must come from the random module so both engines see the same
+numbers.
+
+Run with:
+    python fuzz.py --candidate some_module:FastInterpreter --workers 8
+"""
+import argparse
+import importlib
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fonts import Fonts
+
+REFERENCE = "chip8:Interpreter"
+
+class HeadlessMachine:
+    """The parts of the Emulator an engine needs, without pygame"""
+    def __init__(self, screen_width=64, screen_height=32):
+        self.memory = [0x00] * 0x1000
+        self.v = [0x00] * 0x10
+        self.I = 0x0000
+        self.delay_timer = 0x0
+        self.sound_timer = 0x0
+        self.key_buffer = [0] * 0x10
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+
+    def get_delay_timer(self):
+        return self.delay_timer
+
+    def set_delay_timer(self, new):
+        self.delay_timer = new
+
+    def get_sound_timer(self):
+        return self.sound_timer
+
+    def set_sound_timer(self, new):
+        self.sound_timer = new
+
+class FuzzCase:
+    """A reproducible test, the starting state comes from state_seed (None
+    means a blank machine) and the opcodes are run one after the other"""
+    def __init__(self, state_seed, opcodes):
+        self.state_seed = state_seed
+        self.opcodes = list(opcodes)
+
+    def __repr__(self):
+        opcodes = ", ".join(f"0x{opcode:04X}" for opcode in self.opcodes)
+        return f"FuzzCase(state_seed={self.state_seed}, opcodes=[{opcodes}])"
+
+class Mismatch:
+    def __init__(self, step, opcode, field, expected, got):
+        self.step = step
+        self.opcode = opcode
+        self.field = field
+        self.expected = expected
+        self.got = got
+
+    def __repr__(self):
+        return (f"step {self.step} (0x{self.opcode:04X}): {self.field} "
+                f"expected {self.expected!r}, got {self.got!r}")
+
+def load_engine(path):
+    """Import an engine class from a "module:Class" string"""
+    module_name, class_name = path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+# Choices for the opcode families that only have a few valid low bits
+ARITHMETIC_OPS = (0x0, 0x1, 0x2, 0x3, 0x4, 0x5, 0x6, 0x7, 0xE)
+F_OPS = (0x07, 0x0A, 0x15, 0x18, 0x1E, 0x29, 0x33, 0x55, 0x65)
+
+def random_opcode(rng):
+    """Generate a random valid Chip8 opcode"""
+    # One draw for everything, the top nibble picks the family and the rest
+    # fill in the fields
+    bits = rng.getrandbits(24)
+    family = bits >> 20
+    opcode = family << 12 | bits & 0x0FFF
+    x = opcode & 0x0F00
+    choice = (bits >> 12) & 0xFF
+    match family:
+        case 0x0: return (0x00E0, 0x00EE)[choice & 1]
+        case 0x5 | 0x9: return opcode & 0xFFF0
+        case 0x8: return opcode & 0xFFF0 | ARITHMETIC_OPS[choice % len(ARITHMETIC_OPS)]
+        case 0xE: return 0xE000 | x | (0x9E, 0xA1)[choice & 1]
+        case 0xF: return 0xF000 | x | F_OPS[choice % len(F_OPS)]
+    return opcode
+
+class MachineState:
+    """A random starting state, made once per case and copied into each engine"""
+    def __init__(self, state_seed, screen_width=64, screen_height=32):
+        rng = random.Random(state_seed)
+        self.memory = list(rng.randbytes(0x1000))
+        # Keep the fontset so Fx29 + Dxyn draws real sprites
+        self.memory[:80] = Fonts().font_arr
+        self.v = list(rng.randbytes(0x10))
+        self.key_buffer = unpack_bits(rng.getrandbits(0x10), 0x10)
+        self.delay_timer = rng.randrange(256)
+        self.sound_timer = rng.randrange(256)
+        # Leave room so sprite and Fx55/Fx65 reads usually stay inside memory
+        self.I = rng.randrange(0xFE0)
+        self.pc = rng.randrange(0x200, 0x1000, 2)
+        self.stack = [rng.randrange(0x200, 0x1000, 2) for i in range(rng.randrange(16))]
+        # One big draw for the whole screen rather than one per pixel
+        pixels = unpack_bits(rng.getrandbits(screen_width * screen_height),
+                             screen_width * screen_height)
+        self.screen_buffer = [pixels[y*screen_width:(y+1)*screen_width]
+                              for y in range(screen_height)]
+
+# The 8 bits of every byte value, highest first
+BYTE_BITS = [[(byte >> shift) & 1 for shift in range(7, -1, -1)] for byte in range(256)]
+
+def unpack_bits(n, count):
+    """Turn the low count bits of n into a list of 0s and 1s (count is a
+    multiple of 8)"""
+    bits = []
+    for byte in n.to_bytes(count // 8, "big"):
+        bits += BYTE_BITS[byte]
+    return bits
+
+def build_engine(engine_cls, state):
+    """Make an engine on a headless machine and copy a state into it (None
+    leaves the machine blank)"""
+    machine = HeadlessMachine()
+    engine = engine_cls(machine)
+    if state is None:
+        return engine, machine
+
+    machine.memory[:] = state.memory
+    machine.v[:] = state.v
+    machine.key_buffer[:] = state.key_buffer
+    machine.delay_timer = state.delay_timer
+    machine.sound_timer = state.sound_timer
+    engine.I = state.I
+    engine.pc = state.pc
+    engine.stack[:] = state.stack
+    for row, state_row in zip(engine.screen_buffer, state.screen_buffer):
+        row[:] = state_row
+    return engine, machine
+
+def step(engine, opcode, seed):
+    """Run one opcode, returns the name of the exception it raised if any"""
+    # Only Cxkk uses random numbers so don't pay for reseeding otherwise
+    if opcode & 0xF000 == 0xC000:
+        random.seed(seed)
+    try:
+        engine.run_instruction(opcode)
+    except Exception as e:
+        return type(e).__name__
+    return None
+
+def compare(reference, ref_machine, candidate, cand_machine):
+    """Return (field, expected, got) for the first difference, or None"""
+    fields = (
+        ("pc", reference.pc, candidate.pc),
+        ("I", reference.I, candidate.I),
+        ("v", ref_machine.v, cand_machine.v),
+        ("stack", reference.stack, candidate.stack),
+        ("delay_timer", ref_machine.delay_timer, cand_machine.delay_timer),
+        ("sound_timer", ref_machine.sound_timer, cand_machine.sound_timer),
+        ("waiting_for_press", reference.waiting_for_press, candidate.waiting_for_press),
+        ("stored_key", reference.stored_key, candidate.stored_key),
+        ("memory", ref_machine.memory, cand_machine.memory),
+        ("screen_buffer", reference.screen_buffer, candidate.screen_buffer),
+    )
+    for field, expected, got in fields:
+        if expected != got:
+            return field, expected, got
+    return None
+
+def run_case(reference_cls, candidate_cls, case):
+    """Run a case through both engines, returns (steps run, first Mismatch
+    or None). A step counts once both engines have run its opcode"""
+    state = None if case.state_seed is None else MachineState(case.state_seed)
+    reference, ref_machine = build_engine(reference_cls, state)
+    candidate, cand_machine = build_engine(candidate_cls, state)
+    for i, opcode in enumerate(case.opcodes):
+        ref_error = step(reference, opcode, i)
+        cand_error = step(candidate, opcode, i)
+        if ref_error != cand_error:
+            return i + 1, Mismatch(i, opcode, "exception", ref_error, cand_error)
+        if ref_error is not None:
+            # State after an exception isn't meaningful, so stop here
+            return i + 1, None
+        difference = compare(reference, ref_machine, candidate, cand_machine)
+        if difference is not None:
+            return i + 1, Mismatch(i, opcode, *difference)
+    return len(case.opcodes), None
+
+def shrink(reference_cls, candidate_cls, case, mismatch):
+    """Cut a failing case down to a minimal one that still fails"""
+    case = FuzzCase(case.state_seed, case.opcodes[:mismatch.step+1])
+
+    def still_fails(candidate_case):
+        return run_case(reference_cls, candidate_cls, candidate_case)[1] is not None
+
+    if case.state_seed is not None and still_fails(FuzzCase(None, case.opcodes)):
+        case = FuzzCase(None, case.opcodes)
+
+    # Keep dropping single opcodes until none of them can go
+    removed = True
+    while removed:
+        removed = False
+        for i in range(len(case.opcodes)):
+            smaller = FuzzCase(case.state_seed, case.opcodes[:i] + case.opcodes[i+1:])
+            if still_fails(smaller):
+                case = smaller
+                removed = True
+                break
+    return case, run_case(reference_cls, candidate_cls, case)[1]
+
+def fuzz_cases(reference_cls, candidate_cls, seed, cases, steps):
+    """Run a batch of random cases, returns (instructions run, list of
+    (shrunk case, mismatch))"""
+    rng = random.Random(seed)
+    instructions = 0
+    failures = []
+    for i in range(cases):
+        case = FuzzCase(rng.getrandbits(32), [random_opcode(rng) for j in range(steps)])
+        steps_run, mismatch = run_case(reference_cls, candidate_cls, case)
+        instructions += steps_run
+        if mismatch is not None:
+            failures.append(shrink(reference_cls, candidate_cls, case, mismatch))
+    return instructions, failures
+
+def fuzz_batch(reference_path, candidate_path, seed, cases, steps):
+    """Process pool entry point, classes are passed by import path"""
+    return fuzz_cases(load_engine(reference_path), load_engine(candidate_path),
+                      seed, cases, steps)
+
+def fuzz(candidate_path, reference_path=REFERENCE, workers=None, batches=64,
+         cases=200, steps=100, seed=0):
+    """Spread batches over a process pool, returns (instructions run, failures)"""
+    instructions = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(fuzz_batch, reference_path, candidate_path,
+                            seed + batch, cases, steps)
+                for batch in range(batches)]
+        for job in jobs:
+            batch_instructions, batch_failures = job.result()
+            instructions += batch_instructions
+            failures.extend(batch_failures)
+    return instructions, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential fuzzer for Chip8 engines")
+    parser.add_argument("--candidate", default=REFERENCE,
+                        help="engine to check, as module:Class")
+    parser.add_argument("--reference", default=REFERENCE,
+                        help="engine to trust, as module:Class")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batches", type=int, default=64)
+    parser.add_argument("--cases", type=int, default=200, help="cases per batch")
+    parser.add_argument("--steps", type=int, default=100, help="opcodes per case")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    instructions, failures = fuzz(args.candidate, args.reference, args.workers,
+                                  args.batches, args.cases, args.steps, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"{instructions} instructions in {elapsed:.1f}s "
+          f"({instructions / elapsed * 60:,.0f} per minute)")
+
+    # Lots of random cases usually shrink down to the same few bugs
+    unique = {repr(case): (case, mismatch) for case, mismatch in failures}
+    for case, mismatch in unique.values():
+        print(f"{case}\n    {mismatch}")
+    if not unique:
+        print("No mismatches")
+
+if __name__ == "__main__":
+    main()
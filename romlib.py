@@ -0,0 +1,355 @@
+"""
+Indexed ROM library
+
+Scans a directory of ROM files once and keeps a JSON index next to them,
+keyed by the SHA-1 of each ROM. Every entry has the size, the detected
+platform, a recommended quirk profile and speed, and the disassembly/basic
+blocks of the code that's reachable from 0x200. Files are only re-read when
+their size or modification time changes, so loading a ROM is a lookup plus
+one bulk read.
+
+Index layout:
+    {
+        "version": 1,
+        "roms": {sha1: entry},
+        "files": {relative path: {"sha1": ..., "size": ..., "mtime": ...}}
+    }
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+INDEX_VERSION = 1
+ROM_EXTENSIONS = (".ch8", ".c8", ".sc8", ".xo8")
+PROGRAM_START = 0x200
+
+# Recommended quirk profile and instructions per second for each platform
+PLATFORMS = {
+    "chip8": {"quirks": "vip", "ips": 660},
+    "schip": {"quirks": "schip", "ips": 1800},
+    "xochip": {"quirks": "xochip", "ips": 60000},
+}
+
+def read_rom(path):
+    """Read a whole ROM in one go"""
+    with open(path, "rb") as f:
+        return f.read()
+
+def disassemble_opcode(opcode):
+    """Return the mnemonic for an opcode (Cowgod's names), None if it's not one"""
+    addr = opcode & 0x0FFF
+    x = (opcode & 0x0F00) >> 8
+    y = (opcode & 0x00F0) >> 4
+    n = opcode & 0x000F
+    kk = opcode & 0x00FF
+
+    match (opcode & 0xF000):
+        case 0x0000:
+            match opcode:
+                case 0x00E0: return "CLS"
+                case 0x00EE: return "RET"
+                case 0x00FB: return "SCR"
+                case 0x00FC: return "SCL"
+                case 0x00FD: return "EXIT"
+                case 0x00FE: return "LOW"
+                case 0x00FF: return "HIGH"
+            if opcode & 0xFFF0 == 0x00C0:
+                return f"SCD {n}"
+            if opcode & 0xFFF0 == 0x00D0:
+                return f"SCU {n}"
+            return f"SYS {addr:#05x}"
+        case 0x1000: return f"JP {addr:#05x}"
+        case 0x2000: return f"CALL {addr:#05x}"
+        case 0x3000: return f"SE V{x:X}, {kk:#04x}"
+        case 0x4000: return f"SNE V{x:X}, {kk:#04x}"
+        case 0x5000:
+            match n:
+                case 0x0: return f"SE V{x:X}, V{y:X}"
+                case 0x2: return f"SAVE V{x:X} - V{y:X}"
+                case 0x3: return f"LOAD V{x:X} - V{y:X}"
+        case 0x6000: return f"LD V{x:X}, {kk:#04x}"
+        case 0x7000: return f"ADD V{x:X}, {kk:#04x}"
+        case 0x8000:
+            names = {0x0: "LD", 0x1: "OR", 0x2: "AND", 0x3: "XOR", 0x4: "ADD",
+                     0x5: "SUB", 0x6: "SHR", 0x7: "SUBN", 0xE: "SHL"}
+            if n in names:
+                return f"{names[n]} V{x:X}, V{y:X}"
+        case 0x9000:
+            if n == 0:
+                return f"SNE V{x:X}, V{y:X}"
+        case 0xA000: return f"LD I, {addr:#05x}"
+        case 0xB000: return f"JP V0, {addr:#05x}"
+        case 0xC000: return f"RND V{x:X}, {kk:#04x}"
+        case 0xD000: return f"DRW V{x:X}, V{y:X}, {n}"
+        case 0xE000:
+            match kk:
+                case 0x9E: return f"SKP V{x:X}"
+                case 0xA1: return f"SKNP V{x:X}"
+        case 0xF000:
+            if opcode == 0xF000:
+                return "LD I, long"
+            names = {0x01: "PLANE {x}", 0x02: "AUDIO", 0x07: "LD V{x:X}, DT",
+                     0x0A: "LD V{x:X}, K", 0x15: "LD DT, V{x:X}",
+                     0x18: "LD ST, V{x:X}", 0x1E: "ADD I, V{x:X}",
+                     0x29: "LD F, V{x:X}", 0x30: "LD HF, V{x:X}",
+                     0x33: "LD B, V{x:X}", 0x3A: "PITCH V{x:X}",
+                     0x55: "LD [I], V{x:X}", 0x65: "LD V{x:X}, [I]",
+                     0x75: "LD R, V{x:X}", 0x85: "LD V{x:X}, R"}
+            if kk in names:
+                return names[kk].format(x=x)
+    return None
+
+def is_skip(opcode):
+    """Whether an opcode may skip the instruction after it"""
+    top = opcode & 0xF000
+    return (top in (0x3000, 0x4000)
+            or (top in (0x5000, 0x9000) and opcode & 0x000F == 0)
+            or (top == 0xE000 and opcode & 0x00FF in (0x9E, 0xA1)))
+
+def find_basic_blocks(data, start=PROGRAM_START):
+    """
+    Follow the control flow from the start address and split the reachable
+    code into basic blocks. Returns a sorted list of (start, end) addresses
+    where end is one past the last instruction, and the set of reachable
+    instruction addresses
+    """
+    end_of_rom = start + len(data)
+
+    def opcode_at(addr):
+        offset = addr - start
+        return data[offset] << 8 | data[offset+1]
+
+    leaders = {start}
+    reachable = set()
+    to_visit = [start]
+    while to_visit:
+        addr = to_visit.pop()
+        # Walk straight line code until something changes the flow
+        while start <= addr < end_of_rom - 1 and addr not in reachable:
+            reachable.add(addr)
+            opcode = opcode_at(addr)
+            top = opcode & 0xF000
+            if opcode == 0xF000:
+                # XO-CHIP long load, the next word is the address. It doesn't
+                # change the flow so the block carries on after it
+                addr += 4
+                continue
+            if top in (0x1000, 0x2000):
+                target = opcode & 0x0FFF
+                leaders.add(target)
+                to_visit.append(target)
+                if top == 0x1000:
+                    break
+                leaders.add(addr + 2)
+            elif opcode in (0x00EE, 0x00FD) or top == 0xB000:
+                # Returns, exits and computed jumps end the walk
+                break
+            elif is_skip(opcode):
+                # A skipped long load is 4 bytes, everything else is 2
+                skipped = addr + 2
+                in_rom = skipped < end_of_rom - 1
+                target = skipped + (4 if in_rom and opcode_at(skipped) == 0xF000 else 2)
+                leaders.add(skipped)
+                leaders.add(target)
+                to_visit.append(target)
+            addr += 2
+
+    blocks = []
+    for leader in sorted(leaders):
+        if leader not in reachable:
+            continue
+        addr = leader
+        while addr in reachable and (addr == leader or addr not in leaders):
+            addr += 4 if opcode_at(addr) == 0xF000 else 2
+        blocks.append((leader, addr))
+    return blocks, reachable
+
+def detect_platform(data, reachable, start=PROGRAM_START):
+    """Guess which Chip8 variant a ROM was written for from its code"""
+    # Doesn't fit in 4K so it can't be anything but XO-CHIP
+    if start + len(data) > 0x1000:
+        return "xochip"
+
+    platform = "chip8"
+    for addr in reachable:
+        opcode = data[addr-start] << 8 | data[addr-start+1]
+        top = opcode & 0xF000
+        low = opcode & 0x00FF
+        if (opcode == 0xF000 or opcode == 0xF002
+                or opcode & 0xFFF0 == 0x00D0
+                or (top == 0x5000 and opcode & 0x000F in (0x2, 0x3))
+                or (top == 0xF000 and low in (0x01, 0x3A))):
+            return "xochip"
+        if (opcode in (0x00FB, 0x00FC, 0x00FD, 0x00FE, 0x00FF)
+                or opcode & 0xFFF0 == 0x00C0
+                or (top == 0xD000 and opcode & 0x000F == 0)
+                or (top == 0xF000 and low in (0x30, 0x75, 0x85))):
+            platform = "schip"
+    return platform
+
+def analyze_rom(data):
+    """Build an index entry (minus the hash) for a ROM's contents"""
+    blocks, reachable = find_basic_blocks(data)
+    platform = detect_platform(data, reachable)
+    disassembly = []
+    for addr in sorted(reachable):
+        opcode = data[addr-PROGRAM_START] << 8 | data[addr-PROGRAM_START+1]
+        text = disassemble_opcode(opcode) or f"DW {opcode:#06x}"
+        disassembly.append([addr, opcode, text])
+    return {
+        "size": len(data),
+        "platform": platform,
+        "quirks": PLATFORMS[platform]["quirks"],
+        "ips": PLATFORMS[platform]["ips"],
+        "basic_blocks": [list(block) for block in blocks],
+        "disassembly": disassembly,
+    }
+
+class RomLibrary:
+    def __init__(self, directory, index_file=None):
+        self.directory = directory
+        self.index_file = index_file or os.path.join(directory, "rom_index.json")
+        self.roms = {}
+        self.files = {}
+        self.load_index()
+
+    def load_index(self):
+        """Read the saved index, an old or broken one is just thrown away"""
+        try:
+            with open(self.index_file) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return
+        roms = index.get("roms")
+        files = index.get("files")
+        if not isinstance(roms, dict) or not isinstance(files, dict):
+            return
+        self.roms = roms
+        # Any file entry that doesn't look right just gets scanned again
+        self.files = {rel_path: info for rel_path, info in files.items()
+                      if isinstance(info, dict)
+                      and all(key in info for key in ("sha1", "size", "mtime"))}
+
+    def save_index(self):
+        """Write the index, returns False if it couldn't be saved (e.g. the
+        ROM directory is read only), the library still works without it"""
+        index = {"version": INDEX_VERSION, "roms": self.roms, "files": self.files}
+        # Write to a temp file of our own then rename, so a crash can't leave
+        # half an index behind and other processes saving at the same time
+        # don't trip over each other
+        index_dir = os.path.dirname(os.path.abspath(self.index_file))
+        try:
+            fd, temp_file = tempfile.mkstemp(dir=index_dir, suffix=".tmp")
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(temp_file, self.index_file)
+        except OSError:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def scan(self):
+        """Index any new or changed ROMs in the directory, returns how many
+        files had to be read"""
+        if not os.path.isdir(self.directory):
+            raise RomNotFound(f"ROM directory {self.directory!r} doesn't exist")
+        seen = {}
+        files_read = 0
+        for root, dirs, names in os.walk(self.directory):
+            for name in names:
+                if not name.lower().endswith(ROM_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, self.directory)
+                stat = os.stat(path)
+                cached = self.files.get(rel_path)
+                if (cached is not None and cached["size"] == stat.st_size
+                        and cached["mtime"] == stat.st_mtime_ns
+                        and cached["sha1"] in self.roms):
+                    seen[rel_path] = cached
+                    continue
+
+                data = read_rom(path)
+                files_read += 1
+                sha1 = hashlib.sha1(data).hexdigest()
+                if sha1 not in self.roms:
+                    entry = analyze_rom(data)
+                    entry["sha1"] = sha1
+                    self.roms[sha1] = entry
+                seen[rel_path] = {"sha1": sha1, "size": stat.st_size,
+                                  "mtime": stat.st_mtime_ns}
+
+        changed = files_read > 0 or seen != self.files
+        self.files = seen
+        # Drop analysis for ROMs that aren't in the directory anymore
+        in_use = {info["sha1"] for info in seen.values()}
+        roms = {sha1: entry for sha1, entry in self.roms.items() if sha1 in in_use}
+        changed = changed or len(roms) != len(self.roms)
+        self.roms = roms
+        # Nothing to write if the directory hasn't changed since the last scan
+        if changed:
+            self.save_index()
+        return files_read
+
+    def is_current(self, rel_path):
+        """Whether a file still matches what the index has for it"""
+        info = self.files.get(rel_path)
+        try:
+            stat = os.stat(os.path.join(self.directory, rel_path))
+        except OSError:
+            return False
+        return (info is not None and info["size"] == stat.st_size
+                and info["mtime"] == stat.st_mtime_ns)
+
+    def find(self, key):
+        """Like lookup, but only rescans the directory if the saved index
+        doesn't have an up to date entry for the ROM"""
+        try:
+            rel_path = self.find_file(key)
+            if self.is_current(rel_path):
+                return self.lookup(rel_path)
+        except RomNotFound:
+            pass
+        self.scan()
+        return self.lookup(key)
+
+    def lookup(self, key):
+        """Find a ROM's entry by SHA-1, relative path or file name, returns
+        (path, entry) or raises RomNotFound"""
+        rel_path = self.find_file(key)
+        entry = self.roms.get(self.files[rel_path]["sha1"])
+        if entry is None:
+            # The index has the file but lost its analysis
+            raise RomNotFound(f"No index entry for {rel_path!r} in {self.directory}")
+        return os.path.join(self.directory, rel_path), entry
+
+    def find_file(self, key):
+        """Relative path of the ROM with this SHA-1, relative path or file name"""
+        if key in self.roms:
+            for rel_path, info in self.files.items():
+                if info["sha1"] == key:
+                    return rel_path
+        if key in self.files:
+            return key
+        matches = [rel_path for rel_path in self.files
+                   if os.path.basename(rel_path) == key]
+        if len(matches) != 1:
+            raise RomNotFound(f"No single ROM matching {key!r} in {self.directory}")
+        return matches[0]
+
+    def read(self, key):
+        """Look up a ROM and read it, returns (data, entry)"""
+        path, entry = self.lookup(key)
+        return read_rom(path), entry
+
+class RomNotFound(Exception):
+    pass
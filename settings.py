@@ -9,4 +9,16 @@ class Settings:
         
         # Emulator config
         self.instructions_per_second = 660
-        self.refresh_rate = 60 # Hz
\ No newline at end of file
+        self.refresh_rate = 60 # Hz
+        # "instructions" runs instructions_per_second, "cycles" budgets each
+        # frame in COSMAC VIP machine cycles instead (see timing.py)
+        self.timing_mode = "instructions"
+        self.vblank_wait = True # Only used in cycles mode
+        
+        # Files
+        self.rom_directory = "ROM Files/"
+        
+        # Sound
+        self.sound_enabled = True
+        self.sound_file = "sound.wav"
+        self.volume = 0.8
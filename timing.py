@@ -0,0 +1,100 @@
+"""
+Cycle based timing model for the COSMAC VIP
+
+Instead of running a flat number of instructions per frame, each frame gets
+a budget of machine cycles (about 2600 at 60Hz once the display has taken
+its share) and every opcode costs what it took the original interpreter to
+run it. Register ops are cheap, clearing the screen and drawing are
+expensive, so frames full of cheap opcodes run more of them and frames that
+draw run fewer, the way they did on the real machine.
+
+The costs are approximations based on the instruction timings linked in the
+readme and include fetching/decoding. Some opcodes really take a variable
+amount of time (skips, Fx33) so they're given their typical cost.
+"""
+
+CLOCK_HZ = 1760640
+CLOCKS_PER_MACHINE_CYCLE = 8
+# The display DMA and its interrupt routine steal this much of every VIP frame,
+# which always happen at 60Hz no matter how fast the host refreshes
+DISPLAY_OVERHEAD = 1024 + 46
+VIP_REFRESH_RATE = 60
+
+# Dxyn costs a base amount plus a bit for every row of the sprite
+DRAW_BASE_COST = 68
+DRAW_ROW_COST = 46
+# Fx55/Fx65 cost a base amount plus a bit for every register
+REGISTER_TRANSFER_BASE_COST = 14
+REGISTER_TRANSFER_COST = 14
+DEFAULT_COST = 10
+
+FIXED_COSTS = {
+    0x00E0: 24, 0x00EE: 10,
+}
+
+# Keyed on the highest nibble
+FAMILY_COSTS = {
+    0x0: DEFAULT_COST, 0x1: 12, 0x2: 26, 0x3: 10, 0x4: 10, 0x5: 14,
+    0x6: 6, 0x7: 10, 0x8: 44, 0x9: 14, 0xA: 12, 0xB: 22, 0xC: 36,
+    0xE: 14,
+}
+
+# Keyed on the low byte of Fx?? opcodes
+F_COSTS = {
+    0x07: 10, 0x0A: 12, 0x15: 10, 0x18: 10, 0x1E: 16, 0x29: 20, 0x33: 84,
+}
+
+def opcode_cost(opcode):
+    """Machine cycles it takes to run an opcode"""
+    if opcode in FIXED_COSTS:
+        return FIXED_COSTS[opcode]
+    family = opcode >> 12
+    if family == 0xD:
+        return DRAW_BASE_COST + DRAW_ROW_COST * (opcode & 0x000F)
+    if family == 0xF:
+        low = opcode & 0x00FF
+        if low in (0x55, 0x65):
+            registers = ((opcode & 0x0F00) >> 8) + 1
+            return REGISTER_TRANSFER_BASE_COST + REGISTER_TRANSFER_COST * registers
+        return F_COSTS.get(low, DEFAULT_COST)
+    return FAMILY_COSTS.get(family, DEFAULT_COST)
+
+def build_cost_table():
+    """Cost of every possible opcode so the hot loop is just a list index"""
+    return [opcode_cost(opcode) for opcode in range(0x10000)]
+
+class CycleBudget:
+    def __init__(self, refresh_rate, vblank_wait=True):
+        self.costs = build_cost_table()
+        machine_cycles_per_second = CLOCK_HZ // CLOCKS_PER_MACHINE_CYCLE
+        usable_cycles_per_second = (machine_cycles_per_second
+                                    - VIP_REFRESH_RATE * DISPLAY_OVERHEAD)
+        self.cycles_per_frame = usable_cycles_per_second // refresh_rate
+        if self.cycles_per_frame <= 0:
+            raise ValueError(f"Refresh rate {refresh_rate}Hz is too high for cycle "
+                             f"timing, there'd be no cycles left in a frame")
+        self.vblank_wait = vblank_wait
+        # Cycles an expensive instruction ran over into the next frame
+        self.debt = 0
+
+    def run_frame(self, interpreter):
+        """Run instructions until the frame's cycles are used up, returns how
+        many instructions ran"""
+        costs = self.costs
+        budget = self.cycles_per_frame - self.debt
+        executed = 0
+        while budget > 0:
+            # Same as interpreter.cycle() but we need the opcode for its cost,
+            # so fetch it once here
+            opcode = interpreter.get_next_instruction()
+            interpreter.pc += 2
+            interpreter.run_instruction(opcode)
+            executed += 1
+            budget -= costs[opcode]
+            if self.vblank_wait and opcode & 0xF000 == 0xD000:
+                # The VIP waits for the next interrupt before drawing,
+                # so a draw is always the last thing in a frame
+                budget = 0
+                break
+        self.debt = -budget
+        return executed